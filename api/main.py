@@ -0,0 +1,559 @@
+import asyncio
+import io
+import json
+import os
+import secrets
+import sys
+import time
+from datetime import datetime
+
+from dotenv import load_dotenv
+import traceback
+import logging
+
+load_dotenv()
+
+from fastapi import FastAPI, Request, Form, UploadFile, File, HTTPException
+from fastapi.responses import HTMLResponse, ORJSONResponse, RedirectResponse, Response
+from fastapi.staticfiles import StaticFiles
+from starlette.templating import Jinja2Templates
+from starlette.middleware.sessions import SessionMiddleware
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.responses import PlainTextResponse
+from fastapi.middleware.cors import CORSMiddleware
+
+# Route all logging through a queue so the request path only enqueues;
+# formatting and the write syscalls happen on the listener thread
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+_log_stream = logging.StreamHandler()
+_log_stream.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"))
+_log_queue = queue.SimpleQueue()
+_log_listener = QueueListener(_log_queue, _log_stream)
+_log_listener.start()
+logging.basicConfig(level=logging.INFO, handlers=[QueueHandler(_log_queue)])
+logger = logging.getLogger("shobha")
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(BASE_DIR, "static")
+TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
+
+# Load .env from likely locations (repo root or api folder)
+try:
+    from pathlib import Path
+
+    for candidate in (
+        Path(BASE_DIR) / ".env",
+        Path(BASE_DIR).parent / ".env",
+        Path(BASE_DIR).parent.parent / ".env",
+    ):
+        if candidate.exists():
+            load_dotenv(dotenv_path=str(candidate), override=False)
+except Exception:
+    pass
+
+ADMIN_USERNAME = os.getenv("ADMIN_USERNAME", "admin")
+ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD", "change-this")
+SESSION_SECRET = os.getenv("SESSION_SECRET", secrets.token_hex(32))
+SESSION_COOKIE_NAME = "admin_session"
+SESSION_MAX_AGE_MIN = int(os.getenv("SESSION_MAX_AGE_MIN", "120"))
+
+MAX_FILE_SIZE = 4 * 1024 * 1024  # 4MB per file
+MAX_TOTAL_SIZE = 15 * 1024 * 1024  # 15MB total
+
+app = FastAPI(
+    title="Shobha Sarees Photo Maker",
+    description="Professional photo processing for saree catalogs",
+    version="2.0.0",
+    default_response_class=ORJSONResponse,
+    docs_url=None,
+    redoc_url=None,
+)
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+# Text responses (upload results with long Drive URLs, HTML pages) compress
+# well; below 1KB the gzip header overhead isn't worth it
+app.add_middleware(GZipMiddleware, minimum_size=1000, compresslevel=5)
+
+app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
+templates = Jinja2Templates(directory=TEMPLATES_DIR)
+
+app.add_middleware(
+    SessionMiddleware,
+    secret_key=SESSION_SECRET,
+    session_cookie=SESSION_COOKIE_NAME,
+    same_site="lax",
+    https_only=False,
+    max_age=SESSION_MAX_AGE_MIN * 60,
+)
+
+# Lazy singletons for heavy services
+_platemaker = None
+_drive_uploader = None
+
+# In-memory fallback storage for processed files when Drive is unavailable
+_temp_downloads: dict[str, dict] = {}
+TEMP_MAX_ITEMS = 100
+TEMP_TTL_SECONDS = 900  # 15 minutes
+
+catalog_options = [
+    "Blueberry",
+    "Lavanya",
+    "Soundarya",
+    "Malai Crape",
+    "Sweet Sixteen",
+    "Heritage",
+    "Shakuntala",
+]
+
+
+def get_platemaker():
+    global _platemaker
+    if _platemaker is None:
+        try:
+            try:
+                from .platemaker_module import PlateMaker
+            except ImportError:
+                # Script mode (no package context), e.g. `python api/main.py`
+                sys.path.append(BASE_DIR)
+                from platemaker_module import PlateMaker
+            _platemaker = PlateMaker()
+            logger.info("✅ PlateMaker initialized successfully")
+        except Exception as e:
+            logger.error(f"❌ PlateMaker initialization failed: {e}")
+            traceback.print_exc()
+            _platemaker = False
+    return _platemaker if _platemaker is not False else None
+
+
+def get_drive_uploader():
+    global _drive_uploader
+    if _drive_uploader is None:
+        try:
+            try:
+                from .google_drive_uploader import DriveUploader
+            except ImportError:
+                # Script mode (no package context), e.g. `python api/main.py`
+                sys.path.append(BASE_DIR)
+                from google_drive_uploader import DriveUploader
+            _drive_uploader = DriveUploader()
+            logger.info("✅ DriveUploader initialized successfully")
+        except Exception as e:
+            logger.error(f"❌ DriveUploader initialization failed: {e}")
+            traceback.print_exc()
+            _drive_uploader = False
+    return _drive_uploader if _drive_uploader is not False else None
+
+
+def _cleanup_temp_downloads():
+    now = datetime.utcnow().timestamp()
+    expired_keys = [k for k, v in _temp_downloads.items() if now - v.get("ts", 0) > TEMP_TTL_SECONDS]
+    for k in expired_keys:
+        _temp_downloads.pop(k, None)
+    if len(_temp_downloads) > TEMP_MAX_ITEMS:
+        for k in sorted(_temp_downloads.keys(), key=lambda x: _temp_downloads[x].get("ts", 0))[
+            : len(_temp_downloads) - TEMP_MAX_ITEMS
+        ]:
+            _temp_downloads.pop(k, None)
+
+
+def _store_temp_download(data: bytes, filename: str) -> str:
+    import uuid
+
+    token = uuid.uuid4().hex
+    _temp_downloads[token] = {
+        "data": data,
+        "filename": filename,
+        "ts": datetime.utcnow().timestamp(),
+    }
+    _cleanup_temp_downloads()
+    return token
+
+
+def is_authenticated(request: Request) -> bool:
+    return request.session.get("auth") is True
+
+
+def login_user(request: Request):
+    # Unix timestamps instead of ISO strings: touch_session runs on every
+    # authenticated request and integer comparison needs no parsing
+    request.session["auth"] = True
+    request.session["last_seen"] = int(time.time())
+    request.session["login_time"] = int(time.time())
+
+
+def logout_user(request: Request):
+    request.session.clear()
+
+
+def touch_session(request: Request) -> bool:
+    if not is_authenticated(request):
+        return False
+    last = request.session.get("last_seen")
+    if last:
+        try:
+            if time.time() - float(last) > SESSION_MAX_AGE_MIN * 60:
+                request.session.clear()
+                return False
+        except Exception:
+            # Pre-existing sessions stored ISO strings; treat them as expired
+            request.session.clear()
+            return False
+    request.session["last_seen"] = int(time.time())
+    return True
+
+
+def validate_file_upload(files: list[UploadFile]) -> tuple[bool, str]:
+    """Validate uploaded files"""
+    if not files or len(files) == 0:
+        return False, "No files uploaded"
+
+    if len(files) > 10:
+        return False, "Maximum 10 files allowed per upload"
+
+    total_size = 0
+    oversized_files = []
+    invalid_files = []
+
+    for file in files:
+        if not file.content_type or not file.content_type.startswith("image/"):
+            invalid_files.append(file.filename)
+            continue
+
+        file_size = file.size or 0
+        total_size += file_size
+
+        if file_size > MAX_FILE_SIZE:
+            oversized_files.append(f"{file.filename} ({file_size / (1024 * 1024):.1f}MB)")
+
+    if invalid_files:
+        return False, f"Invalid file types: {', '.join(invalid_files)}"
+
+    if oversized_files:
+        return False, f"Files too large (max 4MB): {', '.join(oversized_files)}"
+
+    if total_size > MAX_TOTAL_SIZE:
+        return False, f"Total size too large: {total_size / (1024 * 1024):.1f}MB (max 15MB)"
+
+    return True, "Valid"
+
+
+# Pre-rendered pages whose output never varies between requests; rendering
+# once skips the Jinja environment and autoescape machinery per hit
+_page_cache: dict[str, bytes] = {}
+
+
+def _render_static_page(name: str) -> bytes:
+    html = _page_cache.get(name)
+    if html is None:
+        html = templates.get_template(name).render().encode()
+        _page_cache[name] = html
+    return html
+
+
+@app.get("/login", response_class=HTMLResponse)
+async def login_page(request: Request):
+    if is_authenticated(request):
+        return RedirectResponse(url="/", status_code=303)
+    return HTMLResponse(_render_static_page("login.html"))
+
+
+@app.post("/login")
+async def login_submit(request: Request, username: str = Form(...), password: str = Form(...)):
+    expects_json = "application/json" in (request.headers.get("accept") or "").lower()
+    if username != ADMIN_USERNAME or password != ADMIN_PASSWORD:
+        error_msg = "Invalid username or password"
+        if expects_json:
+            return ORJSONResponse({"ok": False, "error": error_msg}, status_code=401)
+        return templates.TemplateResponse(
+            request, "login.html", {"error": error_msg}, status_code=401
+        )
+    login_user(request)
+    if expects_json:
+        return ORJSONResponse({"ok": True, "message": "Login successful"})
+    return RedirectResponse(url="/", status_code=303)
+
+
+@app.post("/logout")
+async def logout(request: Request):
+    logout_user(request)
+    return RedirectResponse(url="/login", status_code=303)
+
+
+@app.get("/", response_class=HTMLResponse)
+async def landing(request: Request):
+    if not touch_session(request):
+        return RedirectResponse(url="/login", status_code=303)
+    return HTMLResponse(_render_static_page("landing.html"))
+
+
+@app.get("/app", response_class=HTMLResponse)
+async def app_view(request: Request):
+    if not touch_session(request):
+        return RedirectResponse(url="/login", status_code=303)
+    platemaker = get_platemaker()
+    drive_uploader = get_drive_uploader()
+    return templates.TemplateResponse(
+        request,
+        "index.html",
+        {
+            "catalogs": catalog_options,
+            "services": {
+                "platemaker_ready": platemaker is not None,
+                "drive_uploader_ready": drive_uploader is not None,
+            },
+        },
+    )
+
+
+@app.get("/favicon.ico")
+async def favicon():
+    return RedirectResponse(url="/static/logo.png", status_code=307)
+
+
+@app.get("/download/{token}")
+async def download(token: str):
+    item = _temp_downloads.get(token)
+    if not item:
+        raise HTTPException(status_code=404, detail="File expired or not found")
+    return Response(
+        content=item["data"],
+        media_type="image/jpeg",
+        headers={"Content-Disposition": f'attachment; filename="{item["filename"]}"'},
+    )
+
+
+@app.get("/debug")
+async def debug_info(request: Request):
+    platemaker = get_platemaker()
+    drive_uploader = get_drive_uploader()
+    return {
+        "timestamp": datetime.utcnow().isoformat(),
+        "session": {
+            "auth": request.session.get("auth", False),
+            "last_seen": request.session.get("last_seen", "none"),
+            "login_time": request.session.get("login_time", "none"),
+        },
+        "services": {
+            "platemaker_ready": platemaker is not None,
+            "drive_uploader_ready": drive_uploader is not None,
+        },
+        "limits": {
+            "max_file_size_mb": MAX_FILE_SIZE / (1024 * 1024),
+            "max_total_size_mb": MAX_TOTAL_SIZE / (1024 * 1024),
+            "max_files": 10,
+        },
+        "env_vars": {
+            "admin_username": bool(ADMIN_USERNAME),
+            "session_secret": bool(SESSION_SECRET),
+            "rembg_url": bool(os.getenv("REMBG_API_URL")),
+            "rembg_key": bool(os.getenv("REMBG_API_KEY")),
+            "google_creds": bool(os.getenv("GOOGLE_APPLICATION_CREDENTIALS")),
+            "google_refresh": bool(os.getenv("GOOGLE_REFRESH_TOKEN")),
+        },
+    }
+
+
+@app.get("/health")
+async def health_check():
+    platemaker = get_platemaker()
+    drive_uploader = get_drive_uploader()
+    return {
+        "status": "healthy",
+        "timestamp": datetime.utcnow().isoformat(),
+        "services": {
+            "platemaker": platemaker is not None,
+            "drive_uploader": drive_uploader is not None,
+        },
+    }
+
+
+@app.post("/upload", response_class=ORJSONResponse)
+async def upload_images(
+    request: Request,
+    catalog: str = Form(...),
+    mapping: str = Form(...),
+    files: list[UploadFile] = File(...),
+):
+    if not touch_session(request):
+        raise HTTPException(status_code=401, detail="Session expired")
+
+    try:
+        content_length = int((request.headers.get("content-length") or "0").strip())
+    except ValueError:
+        content_length = 0
+
+    SAFE_TOTAL_LIMIT = MAX_TOTAL_SIZE + 2 * 1024 * 1024
+    if content_length and content_length > SAFE_TOTAL_LIMIT:
+        return ORJSONResponse(
+            {
+                "error": f"Payload too large ({content_length / (1024 * 1024):.1f}MB). "
+                f"Max {MAX_TOTAL_SIZE / (1024 * 1024):.0f}MB total. Please compress or split uploads."
+            },
+            status_code=413,
+        )
+
+    logger.info(f"🔍 Received {len(files)} files")
+
+    if len(files) > 10:
+        return ORJSONResponse({"error": "Maximum 10 files allowed"}, status_code=413)
+
+    platemaker = get_platemaker()
+    drive_uploader = get_drive_uploader()
+
+    if platemaker is None:
+        return ORJSONResponse({"error": "Image processing service unavailable"}, status_code=503)
+
+    drive_available = drive_uploader is not None
+
+    try:
+        design_map = {
+            int(item["index"]): (item.get("design_number", "") or "").strip()
+            for item in json.loads(mapping)
+        }
+    except Exception as e:
+        return ORJSONResponse({"error": f"Invalid design mapping: {str(e)}"}, status_code=400)
+
+    # Read every body up front through starlette's async multipart reader,
+    # then fan the per-file work out; the size checks run before any CPU work
+    img_bodies = await asyncio.gather(*(file.read() for file in files))
+
+    total_bytes_seen = 0
+    oversize_results = []
+    jobs = []
+    for idx, (file, img_bytes) in enumerate(zip(files, img_bodies)):
+        file_bytes_len = len(img_bytes)
+        if file_bytes_len > MAX_FILE_SIZE:
+            oversize_results.append(
+                {
+                    "filename": file.filename,
+                    "status": "error",
+                    "error": f"File too large ({file_bytes_len / (1024 * 1024):.1f}MB). Max 4MB",
+                }
+            )
+            continue
+        total_bytes_seen += file_bytes_len
+        if total_bytes_seen > MAX_TOTAL_SIZE:
+            return ORJSONResponse(
+                {
+                    "error": f"Total size too large ({total_bytes_seen / (1024 * 1024):.1f}MB). "
+                    f"Max {MAX_TOTAL_SIZE / (1024 * 1024):.0f}MB",
+                    "results": oversize_results,
+                },
+                status_code=413,
+            )
+        jobs.append((idx, file, img_bytes))
+
+    # Processing is GIL-releasing PIL work and uploads are blocking HTTPS, so
+    # both go through worker threads; the semaphore caps in-flight Drive calls
+    semaphore = asyncio.Semaphore(4)
+
+    async def _process_one(idx, file, img_bytes):
+        design_number = design_map.get(idx, "") or f"Design_{idx + 1}"
+        try:
+            async with semaphore:
+                try:
+                    processed_img = await asyncio.to_thread(
+                        platemaker.process_image, io.BytesIO(img_bytes), catalog, design_number
+                    )
+                except Exception as e:
+                    return {
+                        "filename": file.filename,
+                        "status": "error",
+                        "error": f"Processing failed: {str(e)[:100]}",
+                        "design_number": design_number,
+                    }
+
+                output_filename = f"{catalog} - {design_number}.jpg"
+                img_out_bytes = io.BytesIO()
+                # quality=92 with full-resolution chroma is visually identical
+                # to 95 but a fraction of the bytes shipped to Drive; a single
+                # encode pass (no optimize/progressive rescans) is also faster
+                processed_img.save(
+                    img_out_bytes, format="JPEG", quality=92,
+                    subsampling=0, optimize=False, progressive=False,
+                )
+                img_out_bytes.seek(0)
+
+                if drive_available:
+                    try:
+                        url = await asyncio.to_thread(
+                            drive_uploader.upload_image, img_out_bytes, output_filename, catalog
+                        )
+                        return {
+                            "filename": output_filename,
+                            "url": url,
+                            "status": "success",
+                            "design_number": design_number,
+                        }
+                    except Exception as e:
+                        return {
+                            "filename": output_filename,
+                            "status": "error",
+                            "error": f"Upload failed: {str(e)[:100]}",
+                            "design_number": design_number,
+                        }
+
+                token = _store_temp_download(img_out_bytes.getvalue(), output_filename)
+                temp_url = str(request.url_for("download", token=token))
+                return {
+                    "filename": output_filename,
+                    "url": temp_url,
+                    "status": "success",
+                    "design_number": design_number,
+                    "note": "Drive unavailable. Temporary download link valid for 15 minutes.",
+                }
+        except Exception as e:
+            return {
+                "filename": file.filename,
+                "status": "error",
+                "error": f"File error: {str(e)[:100]}",
+            }
+
+    results = oversize_results + list(
+        await asyncio.gather(*(_process_one(idx, file, img_bytes) for idx, file, img_bytes in jobs))
+    )
+
+    return ORJSONResponse(
+        {
+            "results": results,
+            "catalog": catalog,
+            "total": len(files),
+            "successful": len([r for r in results if r["status"] == "success"]),
+            "failed": len([r for r in results if r["status"] == "error"]),
+        }
+    )
+
+
+@app.exception_handler(404)
+async def not_found(request: Request, exc):
+    return templates.TemplateResponse(request, "404.html", status_code=404)
+
+
+@app.exception_handler(500)
+async def server_error(request: Request, exc):
+    return templates.TemplateResponse(request, "500.html", status_code=500)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    # "auto" picks uvloop and httptools when installed (they speed up the
+    # event loop and HTTP parsing over asyncio/h11) but still starts without
+    # them - requirements skips uvloop on Windows
+    uvicorn.run(
+        "api.main:app",
+        host="0.0.0.0",
+        port=int(os.getenv("PORT", "8000")),
+        loop="auto",
+        http="auto",
+        log_level="info",
+    )